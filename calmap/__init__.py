@@ -10,13 +10,12 @@ from __future__ import unicode_literals
 
 import calendar
 import datetime
+import functools
 
-from matplotlib.colors import ColorConverter, ListedColormap
+from matplotlib.colors import to_rgba
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from distutils.version import StrictVersion
-from dateutil.relativedelta import relativedelta
 from matplotlib.patches import Polygon
 
 __version_info__ = ("0", "0", "11")
@@ -28,9 +27,154 @@ __author__ = "Marvin Thielk; Martijn Vermaat"
 __contact__ = "marvin.thielk@gmail.com, martijn@vermaat.name"
 __homepage__ = "https://github.com/MarvinT/calmap"
 
-from plotly.express import line_geo
+# Set to True to build the heatmap grids with a kernel compiled by numba. This
+# only pays off when plotting hundreds of years in one process: importing and
+# compiling numba takes a few tenths of a second, while the kernel saves a few
+# microseconds per year.
+use_numba = False
 
-_pandas_18 = StrictVersion(pd.__version__) >= StrictVersion("0.18")
+# Aggregations that return a single value unchanged.
+_identity_hows = ("sum", "mean", "median", "min", "max", "first", "last")
+
+# Cell edges of the heatmap grid by number of weeks.
+_mesh_coords = {}
+
+
+def _resample_by_day(data, how):
+    """
+    Sample `data` by day using aggregation `how`.
+
+    Data that already has at most one timestamp per day, all at midnight, and
+    no missing values is returned as is (sorted by index) for the
+    aggregations in `_identity_hows`, since aggregating it would not change
+    anything.
+    """
+    if how is None:
+        # Assume already sampled by day.
+        return data
+
+    if (
+        how in _identity_hows
+        and isinstance(data, pd.Series)
+        and data.index.is_normalized
+        and data.index.is_unique
+        and not data.isna().any()
+    ):
+        if data.index.is_monotonic_increasing:
+            return data
+        return data.sort_index()
+
+    # Sample by day.
+    return data.groupby(data.index.normalize()).agg(how).squeeze()
+
+
+def _scatter_year_numpy(values, start_weekday):
+    """
+    Scatter the daily `values` of a year into a (7, weeks) grid.
+
+    Weeks are counted from the week containing January 1st, which is weekday
+    `start_weekday`, with Monday on top. Cells before and after the year are
+    NaN.
+    """
+    doy = np.arange(len(values)) + start_weekday
+    plot_data = np.full((7, doy[-1] // 7 + 1), np.nan)
+    plot_data[6 - doy % 7, doy // 7] = values
+    return plot_data
+
+
+def _scatter_year_loop(values, start_weekday):
+    """
+    Same as `_scatter_year_numpy`, as a plain loop without index arrays for
+    compiling with numba, see `_compile_scatter_year`.
+    """
+    plot_data = np.full((7, (len(values) + start_weekday - 1) // 7 + 1), np.nan)
+    for i in range(len(values)):
+        doy = i + start_weekday
+        plot_data[6 - doy % 7, doy // 7] = values[i]
+    return plot_data
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_scatter_year():
+    """
+    Compile `_scatter_year_loop` with numba, importing numba on first use.
+    """
+    import numba
+
+    return numba.njit(cache=True)(_scatter_year_loop)
+
+
+def _scatter_year(values, start_weekday):
+    """
+    Scatter the daily `values` of a year into a (7, weeks) grid, see
+    `_scatter_year_numpy`. Uses the numba kernel if `use_numba` is set.
+    """
+    if use_numba:
+        return _compile_scatter_year()(values, start_weekday)
+    return _scatter_year_numpy(values, start_weekday)
+
+
+def _split_years(by_day, first_year, last_year):
+    """
+    Split daily data in one array per year from `first_year` to `last_year`.
+
+    Each array has a value for every day of the year, NaN for days without
+    data. The arrays are views into one array covering all years.
+    """
+    year_starts = np.arange(
+        f"{first_year}", f"{last_year + 2}", dtype="datetime64[Y]"
+    ).astype("datetime64[D]")
+    bounds = (year_starts - year_starts[0]).astype(int)
+
+    # Day offset of the data since the start of the first year. Only
+    # timestamps at midnight match a day.
+    dates = by_day.index.values
+    days = (dates.astype("datetime64[D]") - year_starts[0]).astype(int)
+    in_range = (dates == dates.astype("datetime64[D]")) & (days >= 0)
+    in_range &= days < bounds[-1]
+
+    all_days = np.full(bounds[-1], np.nan)
+    all_days[days[in_range]] = by_day.values[in_range]
+
+    return {
+        year: all_days[bounds[i] : bounds[i + 1]]
+        for i, year in enumerate(range(first_year, last_year + 1))
+    }
+
+
+def _outline(left, right, top, bottom):
+    """
+    Get the corners of the polygon around a range of days in the grid.
+
+    The range starts in week column `left` at row `top` and ends in week
+    column `right` at row `bottom`.
+    """
+    return [
+        (left, top + 1),
+        (left, 0),
+        (right, 0),
+        (right, bottom),
+        (right + 1, bottom),
+        (right + 1, 7),
+        (left + 1, 7),
+        (left + 1, top + 1),
+    ]
+
+
+def _get_day_ticks(daylabels, dayticks):
+    """
+    Get the y tick positions and labels for `daylabels` and `dayticks`, see
+    `yearplot`.
+    """
+    # Get indices for daylabels.
+    if dayticks is True:
+        dayticks = range(len(daylabels))
+    elif dayticks is False:
+        dayticks = []
+    elif isinstance(dayticks, int):
+        dayticks = range(len(daylabels))[dayticks // 2 :: dayticks]
+
+    return [6 - i + 0.3 for i in dayticks], [daylabels[i] for i in dayticks]
 
 
 def yearplot(
@@ -65,7 +209,11 @@ def yearplot(
     how : string
         Method for resampling data by day. If `None`, assume data is already
         sampled by day and don't resample. Otherwise, this is passed to Pandas
-        `Series.resample` (pandas < 0.18) or `pandas.agg` (pandas >= 0.18).
+        `agg` on the data grouped by day.
+        Data with at most one timestamp per day, all at midnight, and no
+        missing values is used as is when `how` is one of 'sum', 'mean',
+        'median', 'min', 'max', 'first' or 'last', since resampling would not
+        change it.
     vmin : float
         Min Values to anchor the colormap. If `None`, min and max are used after
         resampling data by day.
@@ -145,15 +293,7 @@ def yearplot(
     if year is None:
         year = data.index.sort_values()[0].year
 
-    if how is None:
-        # Assume already sampled by day.
-        by_day = data
-    else:
-        # Sample by day.
-        if _pandas_18:
-            by_day = data.groupby(level=0).agg(how).squeeze()
-        else:
-            by_day = data.resample("D", how=how)
+    by_day = _resample_by_day(data, how)
 
     # Min and max per day.
     if vmin is None:
@@ -161,6 +301,53 @@ def yearplot(
     if vmax is None:
         vmax = by_day.max()
 
+    return _yearplot_from_array(
+        _split_years(by_day, year, year)[year],
+        year,
+        vmin=vmin,
+        vmax=vmax,
+        cmap=cmap,
+        fillcolor=fillcolor,
+        linewidth=linewidth,
+        linecolor=linecolor,
+        daylabels=daylabels,
+        daylabel_kws=daylabel_kws,
+        dayticks=dayticks,
+        monthlabels=monthlabels,
+        monthticks=monthticks,
+        monthly_border=monthly_border,
+        ax=ax,
+        **kwargs
+    )
+
+
+def _yearplot_from_array(
+    values,
+    year,
+    vmin,
+    vmax,
+    cmap="Reds",
+    fillcolor="whitesmoke",
+    linewidth=1,
+    linecolor=None,
+    daylabels=calendar.day_abbr[:],
+    daylabel_kws=None,
+    dayticks=True,
+    monthlabels=calendar.month_abbr[1:],
+    monthticks=True,
+    monthly_border=False,
+    ax=None,
+    _day_ticks=None,
+    **kwargs
+):
+    """
+    Plot one year of daily values as a calendar heatmap.
+
+    `values` is an array with one value for each day of `year`, NaN for days
+    without data. `_day_ticks` are the day tick positions and labels from
+    `_get_day_ticks`, computed from `daylabels` and `dayticks` if `None`. See
+    `yearplot` for the other arguments.
+    """
     if ax is None:
         ax = plt.gca()
 
@@ -172,50 +359,35 @@ def yearplot(
         # background so in that case we default to white which will usually be
         # the figure or canvas background color.
         linecolor = ax.get_facecolor()
-        if ColorConverter().to_rgba(linecolor)[-1] == 0:
+        if to_rgba(linecolor)[-1] == 0:
             linecolor = "white"
 
-    # Filter on year.
-    by_day = by_day[str(year)]
-
-    # Add missing days.
-    by_day = by_day.reindex(
-        pd.date_range(start=str(year), end=str(year + 1), freq="D")[:-1]
+    values = np.asarray(values, dtype=float)
+    start_weekday = datetime.datetime(year, 1, 1).weekday()
+    plot_data = _scatter_year(values, start_weekday)
+
+    # Draw background of heatmap for all days of the year with fillcolor. The
+    # days of a year are contiguous, so a single polygon covers them.
+    last_day = len(values) - 1 + start_weekday
+    background = Polygon(
+        _outline(0, last_day // 7, 6 - start_weekday, 6 - last_day % 7),
+        facecolor=fillcolor,
+        edgecolor="none",
+        linewidth=0,
+        antialiased=False,
     )
+    ax.add_patch(background)
 
-    # Create data frame we can pivot later.
-    by_day = pd.DataFrame(
-        {
-            "data": by_day,
-            "fill": 1,
-            "day": by_day.index.dayofweek,
-            "week": by_day.index.isocalendar().week,
-        }
-    )
-
-    # There may be some days assigned to previous year's last week or
-    # next year's first week. We create new week numbers for them so
-    # the ordering stays intact and week/day pairs unique.
-    by_day.loc[(by_day.index.month == 1) & (by_day.week > 50), "week"] = 0
-    by_day.loc[(by_day.index.month == 12) & (by_day.week < 10), "week"] = (
-        by_day.week.max() + 1
-    )
-
-    # Pivot data on day and week and mask NaN days. (we can also mask the days with 0 counts)
-    plot_data = by_day.pivot(index="day", columns="week", values="data").values[::-1]
-    plot_data = np.ma.masked_where(np.isnan(plot_data), plot_data)
-
-    # Do the same for all days of the year, not just those we have data for.
-    fill_data = by_day.pivot(index="day", columns="week", values="fill").values[::-1]
-    fill_data = np.ma.masked_where(np.isnan(fill_data), fill_data)
-
-    # Draw background of heatmap for all days of the year with fillcolor.
-    ax.pcolormesh(fill_data, vmin=0, vmax=1, cmap=ListedColormap([fillcolor]))
-
-    # Draw heatmap.
+    # Draw heatmap. Days without data (NaN) are left transparent, so the
+    # background shows through.
+    cmap = plt.get_cmap(cmap).with_extremes(bad="none")
     kwargs["linewidth"] = linewidth
     kwargs["edgecolors"] = linecolor
-    ax.pcolormesh(plot_data, vmin=vmin, vmax=vmax, cmap=cmap, **kwargs)
+    n_weeks = plot_data.shape[1]
+    if n_weeks not in _mesh_coords:
+        _mesh_coords[n_weeks] = np.arange(n_weeks + 1), np.arange(8)
+    X, Y = _mesh_coords[n_weeks]
+    ax.pcolormesh(X, Y, plot_data, vmin=vmin, vmax=vmax, cmap=cmap, **kwargs)
 
     # Limit heatmap to our data.
     ax.set(xlim=(0, plot_data.shape[1]), ylim=(0, plot_data.shape[0]))
@@ -237,44 +409,31 @@ def yearplot(
     elif isinstance(monthticks, int):
         monthticks = range(len(monthlabels))[monthticks // 2 :: monthticks]
 
-    # Get indices for daylabels.
-    if dayticks is True:
-        dayticks = range(len(daylabels))
-    elif dayticks is False:
-        dayticks = []
-    elif isinstance(dayticks, int):
-        dayticks = range(len(daylabels))[dayticks // 2 :: dayticks]
-
     ax.set_xlabel("")
     timestamps = []
 
+    # Day of the year of the first day of each month (and of next year).
+    month_starts = (
+        np.arange(f"{year}-01", f"{year + 1}-02", dtype="datetime64[M]").astype(
+            "datetime64[D]"
+        )
+        - np.datetime64(f"{year}-01-01")
+    ).astype(int)
+    first = month_starts[:-1] + start_weekday
+    last = month_starts[1:] - 1 + start_weekday
+
+    # Monday on top
+    x0, y0 = first // 7, 6 - first % 7
+    x1, y1 = last // 7, 6 - last % 7
+
+    xticks = x0 + (x1 - x0 + 1) / 2
+    labels = list(monthlabels[:12])
+
     # Month borders
-    xticks, labels = [], []
-    for month in range(1, 13):
-        first = datetime.datetime(year, month, 1)
-        last = first + relativedelta(months=1, days=-1)
-        # Monday on top
-        y0 = 6 - first.weekday()
-        y1 = 6 - last.weekday()
-        start = datetime.datetime(year, 1, 1).weekday()
-        x0 = (int(first.strftime("%j")) + start - 1) // 7
-        x1 = (int(last.strftime("%j")) + start - 1) // 7
-        P = [
-            (x0, y0 + 1),
-            (x0, 0),
-            (x1, 0),
-            (x1, y1),
-            (x1 + 1, y1),
-            (x1 + 1, 7),
-            (x0 + 1, 7),
-            (x0 + 1, y0 + 1),
-        ]
-
-        xticks.append(x0 + (x1 - x0 + 1) / 2)
-        labels.append(monthlabels[month - 1])
-        if monthly_border:
+    if monthly_border:
+        for left, right, top, bottom in zip(x0, x1, y0, y1):
             poly = Polygon(
-                P,
+                _outline(left, right, top, bottom),
                 edgecolor="black",
                 facecolor="None",
                 linewidth=1,
@@ -287,7 +446,10 @@ def yearplot(
     ax.set_xticklabels(labels)
     ax.set_ylabel("")
     ax.yaxis.set_ticks_position("right")
-    ax.set_yticks([6 - i + 0.3 for i in dayticks])
+    if _day_ticks is None:
+        _day_ticks = _get_day_ticks(daylabels, dayticks)
+    yticks, yticklabels = _day_ticks
+    ax.set_yticks(yticks)
 
     ylabel_kws = dict(
         fontsize=8,
@@ -296,7 +458,7 @@ def yearplot(
     )
     ylabel_kws.update(daylabel_kws or {})
 
-    ax.set_yticklabels([daylabels[i] for i in dayticks], **ylabel_kws)
+    ax.set_yticklabels(yticklabels, **ylabel_kws)
 
     return ax
 
@@ -328,7 +490,8 @@ def calendarplot(
     how : string
         Method for resampling data by day. If `None`, assume data is already
         sampled by day and don't resample. Otherwise, this is passed to Pandas
-        `Series.resample`.
+        `agg` on the data grouped by day. See `yearplot` for when resampling
+        is skipped.
     yearlabels : bool
        Whether or not to draw the year for each subplot.
     yearascending : bool
@@ -383,10 +546,22 @@ def calendarplot(
 
     nrows = len(years)
 
-    vmin, vmax = kwargs.get("vmin", data.min()), kwargs.get("vmax", data.max())
+    # We explicitely resample by day only once. This is an optimization.
+    by_day = _resample_by_day(data, how)
+
+    # Min and max per day, shared by all years.
+    if vmin is None:
+        vmin = by_day.min()
+    if vmax is None:
+        vmax = by_day.max()
 
     if legend:
         alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxy"
+        if nrows > len(alphabet):
+            raise ValueError(
+                "Cannot plot more than %d years with a legend, use legend=False"
+                % len(alphabet)
+            )
         fig, mosaic = plt.subplot_mosaic(
             ";".join(f"{alphabet[i]}z" for i in range(nrows)),
             width_ratios=[.95, .05],
@@ -395,21 +570,18 @@ def calendarplot(
             # gridspec_kw=gridspec_kws,
             # **fig_kws
         )
-        axes = []
-        for i in range(nrows):
-            axes.append(mosaic[alphabet[i]])
+        axes = [mosaic[alphabet[i]] for i in range(nrows)]
 
         legend_ax: plt.Axes = mosaic["z"]
 
-        v = np.linspace(0, vmax, legend_resolution)
-        m = np.zeros((legend_resolution, 1))
-        for i in range(legend_resolution):
-            m[legend_resolution-i-1, 0] = v[i]
-        legend_ax.imshow(m, cmap=kwargs["cmap"], vmin=vmin, vmax=vmax)
+        m = np.linspace(vmax, vmin, legend_resolution)[:, None]
+        legend_ax.imshow(m, cmap=kwargs.get("cmap", "Reds"), vmin=vmin, vmax=vmax)
         legend_ax.set_xticks([])
-        xticks = [*np.arange(0, legend_resolution, legend_resolution/legend_nticks), legend_resolution]
-        xlabels = reversed([*(round(f) for f in np.arange(0, vmax, vmax/legend_nticks)), vmax])
-        legend_ax.set_yticks(xticks, xlabels)
+        # Ticks at the centers of the first, last and evenly spaced pixels in
+        # between, labeled with the values of those pixels.
+        yticks = np.linspace(0, legend_resolution - 1, legend_nticks + 1)
+        ylabels = [f"{v:.3g}" for v in np.linspace(vmax, vmin, legend_nticks + 1)]
+        legend_ax.set_yticks(yticks, ylabels)
         legend_ax.yaxis.set_ticks_position("right")
     else:
         fig, axes = plt.subplots(
@@ -424,14 +596,8 @@ def calendarplot(
 
 
     plt.suptitle(fig_suptitle)
-    # We explicitely resample by day only once. This is an optimization.
-    if how is None:
-        by_day = data
-    else:
-        if _pandas_18:
-            by_day = data.groupby(level=0).agg(how).squeeze()
-        else:
-            by_day = data.resample("D", how=how)
+
+    yearly = _split_years(by_day, years.min(), years.max())
 
     ylabel_kws = dict(
         fontsize=18,
@@ -441,10 +607,17 @@ def calendarplot(
     )
     ylabel_kws.update(yearlabel_kws)
 
+    # The day labels are the same for all years.
+    day_ticks = _get_day_ticks(
+        kwargs.get("daylabels", calendar.day_abbr[:]), kwargs.get("dayticks", True)
+    )
+
     max_weeks = 0
 
     for year, ax in zip(years, axes):
-        yearplot(by_day, year=year, how=None, ax=ax, **kwargs)
+        _yearplot_from_array(
+            yearly[year], year, vmin, vmax, ax=ax, _day_ticks=day_ticks, **kwargs
+        )
         max_weeks = max(max_weeks, ax.get_xlim()[1])
 
         if yearlabels:
@@ -37,6 +37,7 @@ setup(
     platforms=["any"],
     packages=["calmap"],
     install_requires=install_requires,
+    extras_require={"numba": ["numba"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -5,6 +5,8 @@ Tests for calmap.
 
 from __future__ import unicode_literals
 
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
 import numpy as np
 
 np.random.seed(sum(map(ord, "calmap")))
@@ -61,6 +63,45 @@ def test_yearplot_monthticks_daylabels_dayticks(events):
     return ax.figure
 
 
+def test_yearplot_hourly():
+    """
+    Timestamps during the day are aggregated per day. Without resampling,
+    only timestamps at midnight are plotted.
+    """
+    hours = pd.date_range("2014-01-01", "2014-12-31 23:00", freq="h")
+    hourly = pd.Series(hours.hour + 1.0, index=hours)
+    fig, (ax, ax_none) = plt.subplots(nrows=2)
+    calmap.yearplot(hourly, ax=ax)
+    calmap.yearplot(hourly, how=None, ax=ax_none)
+    plot_data = ax.collections[-1].get_array()
+    assert plot_data.count() == 365
+    assert (plot_data.compressed() == sum(range(1, 25))).all()
+    plot_data = ax_none.collections[-1].get_array()
+    assert plot_data.count() == 365
+    assert (plot_data.compressed() == 1).all()
+    return fig
+
+
+@pytest.mark.parametrize("n_days", [365, 366])
+@pytest.mark.parametrize("start_weekday", range(7))
+def test_scatter_year_numba(monkeypatch, n_days, start_weekday):
+    """
+    The numba kernel for the day grid gives the same grid as NumPy.
+    """
+    pytest.importorskip("numba")
+    values = np.random.randn(n_days)
+    values[::5] = np.nan
+    expected = calmap._scatter_year_numpy(values, start_weekday)
+    kernel = calmap._compile_scatter_year()
+    np.testing.assert_array_equal(kernel.py_func(values, start_weekday), expected)
+    np.testing.assert_array_equal(kernel(values, start_weekday), expected)
+
+    monkeypatch.setattr(calmap, "use_numba", True)
+    np.testing.assert_array_equal(
+        calmap._scatter_year(values, start_weekday), expected
+    )
+
+
 def test_calendarplot(events):
     """
     With `calendarplot` we can plot several years in one figure.
@@ -74,3 +115,126 @@ def test_calendarplot_columns(events):
     """
     fig, axes = calmap.calendarplot(events, ncols=2)
     return fig
+
+
+def test_yearplot_daily(events):
+    """
+    Data that is already sampled by day is plotted the same as data that
+    needs resampling.
+    """
+    daily = events.groupby(level=0).sum()
+    fig, (ax, expected) = plt.subplots(nrows=2)
+    calmap.yearplot(daily.sample(frac=1), year=2014, ax=ax)
+    calmap.yearplot(events, year=2014, ax=expected)
+    np.testing.assert_array_equal(
+        ax.collections[-1].get_array(), expected.collections[-1].get_array()
+    )
+    return ax.figure
+
+
+def test_yearplot_cmap_extremes(events):
+    """
+    The heatmap holds only the data, so the over and under colors of the
+    colormap are used for values outside vmin and vmax.
+    """
+    cmap = plt.get_cmap("viridis").with_extremes(over="magenta", under="cyan")
+    ax = calmap.yearplot(events, year=2014, cmap=cmap, vmin=-0.5, vmax=0.5)
+    mesh = ax.collections[-1]
+    np.testing.assert_array_equal(mesh.get_cmap().get_over(), to_rgba("magenta"))
+    np.testing.assert_array_equal(mesh.get_cmap().get_under(), to_rgba("cyan"))
+
+    by_day = events.groupby(level=0).sum()
+    expected = by_day[by_day.index.year == 2014].values
+    np.testing.assert_array_equal(
+        np.sort(mesh.get_array().compressed()), np.sort(expected)
+    )
+    return ax.figure
+
+
+def test_yearplot_alpha(events):
+    """
+    Keyword arguments such as `alpha` only apply to the heatmap, the days
+    without data are drawn in an opaque fillcolor.
+    """
+    fig, ax = plt.subplots()
+    calmap.yearplot(events, alpha=0.5, ax=ax)
+    assert ax.collections[-1].get_alpha() == 0.5
+    (background,) = ax.patches
+    assert background.get_facecolor() == to_rgba("whitesmoke")
+    return ax.figure
+
+
+def test_yearplot_no_data(events):
+    """
+    Without any data, all days of the year are drawn in fillcolor.
+    """
+    fig, ax = plt.subplots()
+    calmap.yearplot(events * np.nan, year=2014, how="mean", ax=ax)
+    assert ax.collections[-1].get_array().count() == 0
+    (background,) = ax.patches
+    assert background.get_facecolor() == to_rgba("whitesmoke")
+    return ax.figure
+
+
+@pytest.mark.parametrize(
+    "year, days, outside",
+    [
+        # January 1st, 2016 is a Friday in the last ISO week of 2015.
+        (2016, {(2, 0): 1, (1, 0): 2, (6, 1): 4}, (slice(3, None), 0)),
+        # December 31st, 2018 is a Monday in the first ISO week of 2019.
+        (2018, {(6, 52): 365, (0, 51): 364}, (slice(None, 6), 52)),
+    ],
+)
+def test_yearplot_weeks(year, days, outside):
+    """
+    Weeks are counted from the week containing January 1st up to the week
+    containing December 31st, even if those days belong to an ISO week of
+    another year. Cells outside the year are empty.
+    """
+    dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+    fig, ax = plt.subplots()
+    calmap.yearplot(pd.Series(np.arange(1, len(dates) + 1), index=dates), ax=ax)
+    plot_data = ax.collections[-1].get_array()
+    assert plot_data.shape == (7, 53)
+    for cell, day in days.items():
+        assert plot_data[cell] == day
+    assert np.ma.getmaskarray(plot_data)[outside].all()
+    return fig
+
+
+def test_calendarplot_legend(events):
+    """
+    The legend shows the colormap from vmax at the top to vmin at the bottom,
+    with ticks labeled by the values at their positions.
+    """
+    fig, axes = calmap.calendarplot(events, vmin=-2, vmax=2.5)
+    (legend_ax,) = [ax for ax in fig.axes if ax not in axes]
+    image = legend_ax.images[0].get_array()[:, 0]
+    assert legend_ax.images[0].get_cmap().name == "Reds"
+    assert image[0] == 2.5
+    assert image[-1] == -2
+
+    yticks = legend_ax.get_yticks()
+    np.testing.assert_allclose(yticks, [0, 9.8, 19.6, 29.4, 39.2, 49])
+    np.testing.assert_allclose(
+        np.interp(yticks, np.arange(len(image)), image),
+        [2.5, 1.6, 0.7, -0.2, -1.1, -2],
+    )
+    assert [t.get_text() for t in legend_ax.get_yticklabels()] == [
+        "2.5",
+        "1.6",
+        "0.7",
+        "-0.2",
+        "-1.1",
+        "-2",
+    ]
+    return fig
+
+
+def test_calendarplot_legend_too_many_years():
+    """
+    With a legend, `calendarplot` can plot at most 51 years.
+    """
+    days = pd.date_range("1950-01-01", "2010-12-31", freq="MS")
+    with pytest.raises(ValueError, match="legend"):
+        calmap.calendarplot(pd.Series(1, index=days))